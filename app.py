@@ -2,107 +2,386 @@
 
 from __future__ import annotations
 
+import hashlib
+import heapq
+import itertools
 import os
+import shutil
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
-from dataclasses import dataclass, field
-from io import BytesIO
-from typing import Dict, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, BinaryIO, Dict, Iterator, Optional
 from uuid import uuid4
 
-from fastapi import BackgroundTasks, FastAPI, File, HTTPException, UploadFile
+from anyio import to_thread
+from fastapi import BackgroundTasks, FastAPI, File, Header, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-from convert import convert_glb_bytes
+from convert import convert_glb_bytes, warm_up
 
 
 DEFAULT_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
 DEFAULT_TIMEOUT = int(os.getenv("JOB_TIMEOUT_SECONDS", "120"))
-
-
-@dataclass
+RESULT_CACHE_ENTRIES = int(os.getenv("RESULT_CACHE_ENTRIES", "32"))
+RESULT_CACHE_BYTES = int(os.getenv("RESULT_CACHE_BYTES", str(512 * 1024 * 1024)))
+JOB_ID_BATCH = 256
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+# Archives below this size are sent in one response body instead of streamed.
+INLINE_DOWNLOAD_BYTES = 16 * 1024 * 1024
+# Threads available to sync endpoints (uploads, polls, downloads); conversions
+# run on the JobManager's own WORKER_CONCURRENCY pool.
+API_THREAD_LIMIT = int(os.getenv("API_THREAD_LIMIT", str(max(4, DEFAULT_CONCURRENCY * 4))))
+
+
+@dataclass(slots=True)
 class JobRecord:
 	job_id: str
 	status: str = "queued"
 	detail: Optional[str] = None
-	artefacts: list[str] = field(default_factory=list)
-	archive: Optional[bytes] = None
+	artefacts: tuple[str, ...] = ()
+	archive_path: Optional[Path] = None
 	created_at: float = field(default_factory=lambda: time.time())
 	started_at: Optional[float] = None
 	finished_at: Optional[float] = None
 	original_name: Optional[str] = None
+	purged: bool = field(default=False, init=False, repr=False)
+	_rlock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
 
+	def snapshot(self) -> dict[str, Any]:
+		"""Return a consistent copy of the public fields."""
 
-class JobManager:
-	"""Coordinates background conversion jobs with a hard timeout."""
+		with self._rlock:
+			return {f.name: getattr(self, f.name) for f in fields(self) if not f.name.startswith("_")}
+
+
+@dataclass(slots=True)
+class _Conversion:
+	"""One running conversion, shared by every job that uploaded the same GLB."""
 
-	def __init__(self, timeout_seconds: int, max_workers: int) -> None:
+	digest: str
+	future: Future
+	started_at: float = field(default_factory=lambda: time.time())
+	job_ids: list[str] = field(default_factory=list)
+
+
+class JobManager:
+	"""Coordinates background conversion jobs with a hard timeout.
+
+	Finished archives are memoised by a hash of the uploaded payload and file
+	name, so re-uploading an identical GLB is answered from the cache and
+	concurrent identical uploads share a single conversion. Archives are
+	spilled to temp files as soon as they are produced and streamed from disk
+	on download; cache entries are hard links to those files.
+
+	Job lookups never take the manager lock: each record guards its own
+	fields, and ``_lock`` only serialises writers of the job table, the result
+	cache, the in-flight map and the deadline and expiry heaps.
+
+	Completion is handled by one future callback per conversion; a single
+	reaper thread enforces the timeout for every conversion, so no thread is
+	spawned per submission. Jobs that join a running conversion share its
+	start time and deadline.
+	"""
+
+	def __init__(
+		self,
+		timeout_seconds: int,
+		max_workers: int,
+		cache_entries: int = RESULT_CACHE_ENTRIES,
+		cache_bytes: int = RESULT_CACHE_BYTES,
+	) -> None:
 		self._timeout = timeout_seconds
 		self._executor = ThreadPoolExecutor(max_workers=max_workers)
 		self._lock = threading.Lock()
 		self._jobs: Dict[str, JobRecord] = {}
+		self._cache_entries = cache_entries
+		self._cache_bytes = cache_bytes
+		self._cache_size = 0
+		self._result_cache: OrderedDict[str, tuple[Path, int, tuple[str, ...]]] = OrderedDict()
+		self._tokens = itertools.count()
+		self._conversions: Dict[int, _Conversion] = {}
+		self._inflight: Dict[str, int] = {}
+		self._deadlines: list[tuple[float, int]] = []
+		self._expiry: list[tuple[float, str]] = []
+		self._id_pool: deque[str] = deque()
+		self._deadline_added = threading.Condition(self._lock)
+		threading.Thread(target=self._reap_expired, name="job-reaper", daemon=True).start()
 
 	def submit(self, payload: bytes, filename: str) -> str:
-		job_id = uuid4().hex
+		# The exported OBJ and artefact list are named after the upload, so the
+		# name is part of the key alongside the content.
+		hasher = hashlib.blake2b(payload, digest_size=16)
+		hasher.update(b"\0" + (Path(filename).name or "model.glb").encode())
+		digest = hasher.hexdigest()
+		with self._lock:
+			job_id = self._next_job_id()
+			cached = self._result_cache.get(digest)
+			if cached is not None:
+				self._result_cache.move_to_end(digest)
 		record = JobRecord(job_id=job_id, original_name=filename)
+
+		if cached is not None:
+			cached_path, _, artefacts = cached
+			# Linking (or copying, where links are unsupported) happens outside
+			# the lock; a cache file that has vanished is dropped and the upload
+			# is converted afresh.
+			try:
+				archive_path = _link_archive(cached_path)
+			except OSError:
+				self._drop_cached(digest, cached_path)
+			else:
+				now = time.time()
+				record.status = "finished"
+				record.archive_path = archive_path
+				record.artefacts = artefacts
+				record.started_at = now
+				record.finished_at = now
+				with self._lock:
+					self._jobs[job_id] = record
+					heapq.heappush(self._expiry, (now, job_id))
+				return job_id
+
 		with self._lock:
+			token = self._inflight.get(digest)
+			conversion = None if token is None else self._conversions.get(token)
+			created = conversion is None
+			if conversion is None:
+				token = next(self._tokens)
+				conversion = _Conversion(digest, self._executor.submit(_convert_to_file, payload, filename))
+				self._conversions[token] = conversion
+				self._inflight[digest] = token
+				heapq.heappush(self._deadlines, (conversion.started_at + self._timeout, token))
+				self._deadline_added.notify()
+			conversion.job_ids.append(job_id)
+			record.status = "running"
+			record.started_at = conversion.started_at
 			self._jobs[job_id] = record
+			heapq.heappush(self._expiry, (record.created_at, job_id))
 
-		future = self._executor.submit(convert_glb_bytes, payload, filename)
-		threading.Thread(
-			target=self._monitor_future,
-			args=(job_id, future),
-			daemon=True,
-		).start()
+		if created:
+			conversion.future.add_done_callback(lambda done: self._on_done(token, done))
 		return job_id
 
-	def _monitor_future(self, job_id, future) -> None:  # type: ignore[no-untyped-def]
+	def _next_job_id(self) -> str:
+		"""Hand out a random 128-bit hex ID. Caller holds the lock."""
+
+		if not self._id_pool:
+			# One urandom call per batch instead of one per job; the IDs are
+			# still CSPRNG output of the same width as uuid4().hex.
+			buffer = os.urandom(16 * JOB_ID_BATCH)
+			self._id_pool.extend(buffer[i : i + 16].hex() for i in range(0, len(buffer), 16))
+		return self._id_pool.popleft()
+
+	def _cache_result(self, digest: str, cache_path: Path, size: int, artefacts: tuple[str, ...]) -> list[Path]:
+		"""Store a finished archive, evicting least recently used entries.
+
+		Caller holds the lock and unlinks the returned paths once it is released.
+		"""
+
+		if digest in self._result_cache:
+			return [cache_path]
+		self._result_cache[digest] = (cache_path, size, artefacts)
+		self._cache_size += size
+		evicted: list[Path] = []
+		while len(self._result_cache) > self._cache_entries or self._cache_size > self._cache_bytes:
+			_, (path, evicted_size, _) = self._result_cache.popitem(last=False)
+			self._cache_size -= evicted_size
+			evicted.append(path)
+		return evicted
+
+	def _drop_cached(self, digest: str, cache_path: Path) -> None:
 		with self._lock:
-			record = self._jobs.get(job_id)
-			if record is None:
+			entry = self._result_cache.get(digest)
+			if entry is None or entry[0] != cache_path:
 				return
-			record.status = "running"
-			record.started_at = time.time()
+			del self._result_cache[digest]
+			self._cache_size -= entry[1]
+		_discard_archive(cache_path)
 
+	def _finish_conversion(self, token: int) -> Optional[_Conversion]:
+		"""Detach a conversion from the manager; only the first caller gets it."""
+
+		with self._lock:
+			conversion = self._conversions.pop(token, None)
+			if conversion is not None and self._inflight.get(conversion.digest) == token:
+				del self._inflight[conversion.digest]
+		return conversion
+
+	def _reap_expired(self) -> None:
+		# Every conversion gets the same timeout, so deadlines arrive in order
+		# and the heap head is always the next one due. Entries of conversions
+		# that already completed are skipped when they reach the head.
+		while True:
+			with self._deadline_added:
+				while not self._deadlines:
+					self._deadline_added.wait()
+				deadline, token = self._deadlines[0]
+				if token not in self._conversions:
+					heapq.heappop(self._deadlines)
+					continue
+				remaining = deadline - time.time()
+				if remaining > 0:
+					self._deadline_added.wait(remaining)
+					continue
+				heapq.heappop(self._deadlines)
+			self._expire(token)
+
+	def _expire(self, token: int) -> None:
+		conversion = self._finish_conversion(token)
+		if conversion is None:
+			return
+		conversion.future.cancel()
+		for record in self._records(conversion):
+			self._mark_ended(record, "timeout", f"Conversion exceeded {self._timeout}s limit")
+
+	def _records(self, conversion: _Conversion) -> list[JobRecord]:
+		return [record for record in map(self._jobs.get, conversion.job_ids) if record is not None]
+
+	def _mark_ended(self, record: JobRecord, status: str, detail: str) -> None:
+		with record._rlock:
+			if record.status == "running":
+				record.status = status
+				record.detail = detail
+				record.finished_at = time.time()
+
+	def _on_done(self, token: int, future: Future) -> None:
+		conversion = self._finish_conversion(token)
+		if conversion is None:
+			# The reaper already timed these jobs out; drop the late result.
+			if not future.cancelled() and future.exception() is None:
+				_discard_archive(future.result()[0])
+			return
+		if future.cancelled():
+			for record in self._records(conversion):
+				self._mark_ended(record, "failed", "Conversion was cancelled")
+			return
+
+		exc = future.exception()
+		if exc is not None:
+			for record in self._records(conversion):
+				self._mark_ended(record, "failed", str(exc))
+			return
+
+		# The worker spilled the archive once; every waiting record and the
+		# cache get their own hard link to it and the original name is dropped.
+		spilled, artefacts = future.result()
+		digest = conversion.digest
+		records = self._records(conversion)
+		links: list[Path] = []
 		try:
-			archive_bytes, artefacts = future.result(timeout=self._timeout)
-		except FuturesTimeoutError:
-			future.cancel()
-			with self._lock:
-				record = self._jobs.get(job_id)
-				if record is not None:
-					record.status = "timeout"
-					record.detail = f"Conversion exceeded {self._timeout}s limit"
-					record.finished_at = time.time()
-		except Exception as exc:  # noqa: BLE001
-			with self._lock:
-				record = self._jobs.get(job_id)
-				if record is not None:
-					record.status = "failed"
-					record.detail = str(exc)
-					record.finished_at = time.time()
-		else:
+			size = spilled.stat().st_size
+			for _ in records:
+				links.append(_link_archive(spilled))
+			cache_path = None
+			if size <= self._cache_bytes and digest not in self._result_cache:
+				cache_path = _link_archive(spilled)
+		except OSError as exc:
+			for path in links:
+				_discard_archive(path)
+			for record in records:
+				self._mark_ended(record, "failed", f"Could not store archive: {exc}")
+			return
+		finally:
+			_discard_archive(spilled)
+
+		stale: list[Path] = []
+		if cache_path is not None:
 			with self._lock:
-				record = self._jobs.get(job_id)
-				if record is not None:
+				stale = self._cache_result(digest, cache_path, size, artefacts)
+		for record, archive_path in zip(records, links):
+			with record._rlock:
+				if record.purged or record.status != "running":
+					stale.append(archive_path)
+				else:
 					record.status = "finished"
-					record.archive = archive_bytes
+					record.archive_path = archive_path
 					record.artefacts = artefacts
 					record.finished_at = time.time()
+		for path in stale:
+			_discard_archive(path)
 
-	def get(self, job_id: str) -> Optional[JobRecord]:
-		with self._lock:
-			return self._jobs.get(job_id)
+	def get(self, job_id: str) -> Optional[dict[str, Any]]:
+		record = self._jobs.get(job_id)
+		return None if record is None else record.snapshot()
 
 	def cleanup(self, max_age_seconds: int) -> None:
 		threshold = time.time() - max_age_seconds
+		stale: list[Path] = []
+		with self._lock:
+			# Records enter the heap keyed by creation time. A record that has
+			# since finished inside the retention window is pushed back under its
+			# finish time, so only expired jobs are ever visited.
+			while self._expiry and self._expiry[0][0] < threshold:
+				_, job_id = heapq.heappop(self._expiry)
+				record = self._jobs.get(job_id)
+				if record is None:
+					continue
+				with record._rlock:
+					finished = record.finished_at or record.created_at
+					if finished >= threshold:
+						heapq.heappush(self._expiry, (finished, job_id))
+						continue
+					record.purged = True
+					if record.archive_path is not None:
+						stale.append(record.archive_path)
+				del self._jobs[job_id]
+		for path in stale:
+			_discard_archive(path)
+
+	def clear_cache(self) -> None:
 		with self._lock:
-			for job_id, record in list(self._jobs.items()):
-				finished = record.finished_at or record.created_at
-				if finished < threshold:
-					del self._jobs[job_id]
+			stale = [path for path, _, _ in self._result_cache.values()]
+			self._result_cache.clear()
+			self._cache_size = 0
+		for path in stale:
+			_discard_archive(path)
+
+
+def _convert_to_file(payload: bytes, filename: str) -> tuple[Path, tuple[str, ...]]:
+	# Runs on the worker: the archive goes to disk before the future resolves,
+	# so the in-memory ZIP is released as soon as this returns.
+	archive, artefacts = convert_glb_bytes(payload, filename)
+	return _spill_archive(archive), tuple(artefacts)
+
+
+def _spill_archive(archive: memoryview) -> Path:
+	with NamedTemporaryFile(prefix="glbobx-", suffix=".zip", delete=False) as handle:
+		try:
+			handle.write(archive)
+		except BaseException:
+			handle.close()
+			_discard_archive(Path(handle.name))
+			raise
+	return Path(handle.name)
+
+
+def _link_archive(source: Path) -> Path:
+	# Hard links let several records share one file on disk; each owner
+	# unlinks its own name and the data goes away with the last one.
+	target = source.with_name(f"glbobx-{uuid4().hex}.zip")
+	try:
+		os.link(source, target)
+	except FileNotFoundError:
+		raise
+	except OSError:
+		try:
+			shutil.copyfile(source, target)
+		except OSError:
+			_discard_archive(target)
+			raise
+	return target
+
+
+def _discard_archive(path: Path) -> None:
+	try:
+		path.unlink()
+	except FileNotFoundError:
+		pass
 
 
 job_manager = JobManager(timeout_seconds=DEFAULT_TIMEOUT, max_workers=DEFAULT_CONCURRENCY)
@@ -122,9 +401,21 @@ def health_check() -> dict[str, str]:
 	return {"status": "ok"}
 
 
+@app.on_event("startup")
+def limit_threadpool() -> None:
+	to_thread.current_default_thread_limiter().total_tokens = API_THREAD_LIMIT
+
+
+@app.on_event("startup")
+def warm_up_converter() -> None:
+	warm_up()
+
+
 @app.post("/convert")
-async def submit_conversion(background_tasks: BackgroundTasks, file: UploadFile = File(...)) -> JSONResponse:
-	payload = await file.read()
+def submit_conversion(background_tasks: BackgroundTasks, file: UploadFile = File(...)) -> JSONResponse:
+	# Sync endpoint: FastAPI already runs it in the (capped) threadpool, so
+	# the spooled upload is read directly instead of via another thread hop.
+	payload = file.file.read()
 	if not payload:
 		raise HTTPException(status_code=400, detail="Uploaded file is empty")
 
@@ -134,41 +425,69 @@ async def submit_conversion(background_tasks: BackgroundTasks, file: UploadFile
 
 
 @app.get("/jobs/{job_id}")
-def fetch_job(job_id: str) -> JSONResponse:
+def fetch_job(job_id: str, if_none_match: Optional[str] = Header(default=None)) -> Response:
 	record = job_manager.get(job_id)
 	if record is None:
 		raise HTTPException(status_code=404, detail="Job not found")
 
+	# A job's reply only changes when it moves between states, so pollers can
+	# revalidate cheaply and get an empty 304 while nothing has happened.
+	state = f"{record['status']}:{record['started_at']}:{record['finished_at']}"
+	etag = f'"{hashlib.blake2b(state.encode(), digest_size=8).hexdigest()}"'
+	if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+		return Response(status_code=304, headers={"ETag": etag})
+
+	finished = record["status"] == "finished"
 	response: dict[str, object] = {
-		"job_id": record.job_id,
-		"status": record.status,
-		"detail": record.detail,
-		"artefacts": record.artefacts if record.status == "finished" else [],
-		"created_at": record.created_at,
-		"started_at": record.started_at,
-		"finished_at": record.finished_at,
+		"job_id": record["job_id"],
+		"status": record["status"],
+		"detail": record["detail"],
+		"artefacts": record["artefacts"] if finished else [],
+		"created_at": record["created_at"],
+		"started_at": record["started_at"],
+		"finished_at": record["finished_at"],
 	}
-	if record.status == "finished":
-		response["download_url"] = f"/jobs/{record.job_id}/download"
-	return JSONResponse(response)
+	if finished:
+		response["download_url"] = f"/jobs/{record['job_id']}/download"
+	return JSONResponse(response, headers={"ETag": etag})
+
+
+def _iter_archive(handle: BinaryIO) -> Iterator[bytes]:
+	with handle:
+		while chunk := handle.read(DOWNLOAD_CHUNK_BYTES):
+			yield chunk
 
 
 @app.get("/jobs/{job_id}/download")
-def download_archive(job_id: str) -> StreamingResponse:
+def download_archive(job_id: str) -> Response:
 	record = job_manager.get(job_id)
-	if record is None or record.status != "finished" or record.archive is None:
+	if record is None or record["status"] != "finished" or record["archive_path"] is None:
 		raise HTTPException(status_code=404, detail="Job output not available")
 
-	filename = (record.original_name or "model.glb").rsplit(".", 1)[0] or "model"
-	buffer = BytesIO(record.archive)
-	response = StreamingResponse(buffer, media_type="application/zip")
-	response.headers["Content-Disposition"] = f"attachment; filename={filename}.zip"
+	try:
+		handle = open(record["archive_path"], "rb", buffering=DOWNLOAD_CHUNK_BYTES)
+	except FileNotFoundError:
+		raise HTTPException(status_code=404, detail="Job output not available") from None
+	if hasattr(os, "posix_fadvise"):
+		os.posix_fadvise(handle.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+	size = os.fstat(handle.fileno()).st_size
+
+	filename = (record["original_name"] or "model.glb").rsplit(".", 1)[0] or "model"
+	headers = {"Content-Disposition": f"attachment; filename={filename}.zip"}
+	if size < INLINE_DOWNLOAD_BYTES:
+		with handle:
+			content = handle.read()
+		return Response(content=content, media_type="application/zip", headers=headers)
+
+	response = StreamingResponse(_iter_archive(handle), media_type="application/zip", headers=headers)
+	response.headers["Content-Length"] = str(size)
 	return response
 
 
 @app.on_event("shutdown")
 def shutdown_event() -> None:
 	job_manager.cleanup(max_age_seconds=0)
+	job_manager.clear_cache()
 
 
 if __name__ == "__main__":
@@ -9,17 +9,23 @@ library.
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
 import logging
+import os
+import struct
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 from io import BytesIO
 from pathlib import Path
-from tempfile import TemporaryDirectory
 from typing import Iterable
-from zipfile import ZipFile
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
 
 try:  # noqa: SIM105 - handled for runtime dependency messaging
+	import numpy as np
 	import trimesh  # type: ignore
 except ImportError:  # pragma: no cover - only hits when dependency missing
 	trimesh = None  # type: ignore[assignment]
@@ -27,6 +33,18 @@ except ImportError:  # pragma: no cover - only hits when dependency missing
 
 LOGGER = logging.getLogger("glb_to_obj")
 
+OBJ_HEADER = "# https://github.com/mikedh/trimesh"
+OBJ_DIGITS = 8
+_FACE_FORMATS = {
+	("v",): "%d",
+	("v", "vn"): "%d//%d",
+	("v", "vt"): "%d/%d",
+	("v", "vn", "vt"): "%d/%d/%d",
+}
+
+# MTL statements whose last token is a texture file name.
+_MTL_MAP_STATEMENTS = ("map_", "bump", "disp", "decal", "refl", "norm")
+
 
 @dataclass
 class ConversionStats:
@@ -72,6 +90,13 @@ def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
 		action="store_true",
 		help="Overwrite existing .obj files in the output directory.",
 	)
+	parser.add_argument(
+		"--workers",
+		"-j",
+		type=int,
+		default=max(1, (os.cpu_count() or 1) - 1),
+		help="Number of worker processes converting files in parallel (default: CPU count - 1).",
+	)
 	parser.add_argument(
 		"--quiet",
 		"-q",
@@ -118,8 +143,15 @@ def convert_file(src: Path, dst_root: Path, input_root: Path, overwrite: bool) -
 		return "skipped"
 
 	try:
-		scene = trimesh.load(src, force="scene")
-		scene.export(destination)
+		scene = trimesh.load(src, force="scene", process=False)
+		# Models sharing an output directory (possibly converted by parallel
+		# workers) must not write the same MTL/texture files, so side files
+		# are named after the model.
+		obj_text, side_files = export_obj(scene, mtl_name=f"{destination.stem}.mtl")
+		side_files = _prefix_textures(side_files, f"{destination.stem}_")
+		destination.write_text(obj_text, encoding="utf-8")
+		for name, data in side_files.items():
+			(destination.parent / name).write_bytes(data)
 		LOGGER.info("Converted %s -> %s", src, destination)
 		return "converted"
 	except Exception:  # noqa: BLE001
@@ -127,20 +159,25 @@ def convert_file(src: Path, dst_root: Path, input_root: Path, overwrite: bool) -
 		return "failed"
 
 
-def convert_glb_bytes(payload: bytes, filename: str = "model.glb") -> tuple[bytes, list[str]]:
+def convert_glb_bytes(
+	payload: bytes | bytearray | memoryview,
+	filename: str = "model.glb",
+) -> tuple[memoryview, list[str]]:
 	"""Convert an in-memory GLB payload and return a ZIP archive of outputs.
 
 	Parameters
 	----------
 	payload:
-		Raw GLB file bytes.
+		Raw GLB file contents; any bytes-like object, e.g. an upload buffer's
+		``getbuffer()`` view, so callers need not copy it into ``bytes`` first.
 	filename:
 		Original file name (used for extensions and default archive naming).
 
 	Returns
 	-------
 	archive_bytes:
-		Bytes of a ZIP archive containing generated artefacts.
+		Read-only view over the ZIP archive containing generated artefacts. The
+		view keeps the underlying buffer alive, so no extra copy is made.
 	artefacts:
 		Relative paths of files stored in the ZIP.
 
@@ -155,35 +192,220 @@ def convert_glb_bytes(payload: bytes, filename: str = "model.glb") -> tuple[byte
 	if not payload:
 		raise ValueError("GLB payload is empty")
 
-	with TemporaryDirectory() as tmp_dir:
-		tmp_path = Path(tmp_dir)
-		input_dir = tmp_path / "input"
-		output_dir = tmp_path / "output"
-		input_dir.mkdir(parents=True, exist_ok=True)
-		output_dir.mkdir(parents=True, exist_ok=True)
+	if trimesh is None:
+		raise RuntimeError(
+			"trimesh is required for conversion. Install dependencies via 'pip install -r requirements.txt'."
+		)
 
-		src_name = Path(filename).name or "model.glb"
-		src_path = input_dir / src_name
-		src_path.write_bytes(payload)
+	src_name = Path(filename).name or "model.glb"
+	obj_name = Path(src_name).with_suffix(".obj").name
 
-		result = convert_file(src_path, output_dir, input_dir, overwrite=True)
-		if result == "failed":
-			raise RuntimeError("Conversion failed; see logs for details")
+	try:
+		# Pass-through conversion: skip trimesh's vertex merge/cleanup pass.
+		scene = trimesh.load(BytesIO(payload), file_type="glb", force="scene", process=False)
+		obj_text, side_files = export_obj(scene)
+	except Exception as exc:  # noqa: BLE001
+		LOGGER.exception("Failed to convert %s", src_name)
+		raise RuntimeError("Conversion failed; see logs for details") from exc
+
+	produced = {obj_name: obj_text.encode("utf-8"), **_dedupe_textures(side_files)}
+
+	# Everything is written straight from memory. Entries are always stored:
+	# textures are already PNG/JPEG and deflating large OBJ text costs a full
+	# extra pass over the biggest buffers for little size benefit.
+	zip_buffer = BytesIO()
+	artefacts: list[str] = []
+	date_time = time.localtime()[:6]
+	with ZipFile(zip_buffer, "w", compression=ZIP_STORED, allowZip64=True) as zip_file:
+		for arcname in sorted(produced):
+			info = ZipInfo(arcname, date_time=date_time)
+			info.compress_type = ZIP_STORED
+			info.external_attr = 0o644 << 16
+			zip_file.writestr(info, memoryview(produced[arcname]))
+			artefacts.append(arcname)
+
+	LOGGER.info("Converted %s in memory (%s artefacts)", src_name, len(artefacts))
+	return zip_buffer.getbuffer().toreadonly(), artefacts
+
+
+def warm_up() -> None:
+	"""Run one tiny conversion so trimesh's lazy imports happen at startup.
+
+	The first ``trimesh.load`` pulls in the glTF loader and its optional
+	dependencies; doing it here keeps that cost off the first real request.
+	"""
 
-		produced_files = [p for p in output_dir.rglob("*") if p.is_file()]
-		if not produced_files:
-			raise RuntimeError("Conversion completed but produced no files")
+	if trimesh is None:
+		return
+	convert_glb_bytes(_triangle_glb(), "warmup.glb")
+
+
+def _triangle_glb() -> bytes:
+	"""Build the smallest useful GLB: one indexed triangle."""
+
+	binary = struct.pack("<3H2x9f", 0, 1, 2, 0, 0, 0, 1, 0, 0, 0, 1, 0)
+	document = {
+		"asset": {"version": "2.0"},
+		"scene": 0,
+		"scenes": [{"nodes": [0]}],
+		"nodes": [{"mesh": 0}],
+		"meshes": [{"primitives": [{"attributes": {"POSITION": 1}, "indices": 0}]}],
+		"buffers": [{"byteLength": len(binary)}],
+		"bufferViews": [
+			{"buffer": 0, "byteOffset": 0, "byteLength": 6},
+			{"buffer": 0, "byteOffset": 8, "byteLength": 36},
+		],
+		"accessors": [
+			{"bufferView": 0, "componentType": 5123, "count": 3, "type": "SCALAR"},
+			{"bufferView": 1, "componentType": 5126, "count": 3, "type": "VEC3", "min": [0, 0, 0], "max": [1, 1, 0]},
+		],
+	}
+	text = json.dumps(document, separators=(",", ":")).encode()
+	text += b" " * (-len(text) % 4)
+	chunks = struct.pack("<I4s", len(text), b"JSON") + text + struct.pack("<I4s", len(binary), b"BIN\0") + binary
+	return struct.pack("<4sII", b"glTF", 2, 12 + len(chunks)) + chunks
+
+
+def export_obj(scene, mtl_name: str = "material.mtl") -> tuple[str, dict[str, bytes]]:  # type: ignore[no-untyped-def]
+	"""Export a trimesh scene as OBJ text plus its MTL/texture side files.
+
+	Produces the same output as ``trimesh.exchange.obj.export_obj`` but formats
+	each vertex/normal/UV/face array with one printf-style operation instead of
+	a ``str.format`` call over every value, which is several times faster on
+	large meshes. Scenes containing point clouds or vertex colours, or whose
+	materials/normals the fast path cannot export, are handed to trimesh,
+	which skips the parts it cannot convert.
+	"""
 
-		zip_buffer = BytesIO()
-		artefacts: list[str] = []
-		with ZipFile(zip_buffer, "w") as zip_file:
-			for artefact in produced_files:
-				rel_path = artefact.relative_to(output_dir)
-				zip_file.write(artefact, arcname=str(rel_path))
-				artefacts.append(str(rel_path))
+	meshes = list(scene.dump()) if trimesh.util.is_instance_named(scene, "Scene") else [scene]
+	if all(_plain_mesh(mesh) for mesh in meshes):
+		try:
+			return _fast_export_obj(meshes, mtl_name)
+		except Exception:  # noqa: BLE001
+			LOGGER.debug("Vectorised OBJ export failed; falling back to trimesh", exc_info=True)
+	return trimesh.exchange.obj.export_obj(scene, include_texture=True, return_texture=True, mtl_name=mtl_name)
+
+
+def _fast_export_obj(meshes, mtl_name: str) -> tuple[str, dict[str, bytes]]:  # type: ignore[no-untyped-def]
+	objects: list[str] = []
+	materials: dict[int, tuple[dict[str, bytes], str]] = {}
+	material_names: set[str] = set()
+	offset = 0
+	for mesh in meshes:
+		face_type = ["v"]
+		export = [_format_rows(mesh.vertices, "v " + " ".join([f"%.{OBJ_DIGITS}f"] * 3))]
+
+		if "vertex_normals" in mesh._cache.cache:
+			face_type.append("vn")
+			export.append(_format_rows(mesh.vertex_normals, "vn " + " ".join([f"%.{OBJ_DIGITS}f"] * 3)))
+
+		prefix: list[str] = []
+		if hasattr(mesh.visual, "uv"):
+			material = mesh.visual.material
+			if hasattr(material, "to_simple"):
+				material = material.to_simple()
+			hashed = hash(material)
+			if hashed not in materials:
+				name = trimesh.util.unique_name(material.name, material_names)
+				material_names.add(name)
+				materials[hashed] = material.to_obj(name=name)
+			uv = getattr(mesh.visual, "uv", None)
+			if len(np.shape(uv)) == 2:
+				face_type.append("vt")
+				export.append(_format_rows(uv, "vt " + " ".join([f"%.{OBJ_DIGITS}f"] * uv.shape[1])))
+			prefix.append(f"usemtl {materials[hashed][1]}")
+
+		if "name" in mesh.metadata:
+			prefix.insert(0, f"\no {mesh.metadata['name']}")
+
+		vertex_format = _FACE_FORMATS[tuple(face_type)]
+		faces = np.repeat((mesh.faces + 1 + offset).reshape(-1, 1), vertex_format.count("%"), axis=1)
+		export.append(_format_rows(faces.reshape(len(mesh.faces), -1), "f " + " ".join([vertex_format] * 3)))
+		offset += len(mesh.vertices)
+		objects.append("\n".join(prefix + export))
+
+	side_files: dict[str, bytes] = {}
+	if materials:
+		mtl_lib: list[bytes] = []
+		for data, _ in materials.values():
+			for file_name, file_data in data.items():
+				if file_name.lower().endswith(".mtl"):
+					mtl_lib.append(file_data)
+				elif file_name not in side_files:
+					side_files[file_name] = file_data
+		side_files[mtl_name] = f"{OBJ_HEADER}\n\n".encode() + b"\n\n".join(mtl_lib)
+		objects.insert(0, f"mtllib {mtl_name}")
+
+	objects.insert(0, OBJ_HEADER)
+	objects.append("\n")
+	return "\n".join(objects), side_files
+
+
+def _plain_mesh(mesh) -> bool:  # type: ignore[no-untyped-def]
+	return (
+		trimesh.util.is_instance_named(mesh, "Trimesh")
+		and not (mesh.visual.kind in ("vertex", "face") and len(mesh.visual.vertex_colors))
+	)
 
-		zip_buffer.seek(0)
-		return zip_buffer.getvalue(), artefacts
+
+def _format_rows(array, row_format: str) -> str:  # type: ignore[no-untyped-def]
+	values = np.asarray(array)
+	if not len(values):
+		return ""
+	return ((row_format + "\n") * len(values) % tuple(values.ravel().tolist()))[:-1]
+
+
+def _dedupe_textures(side_files: dict[str, bytes]) -> dict[str, bytes]:
+	"""Drop texture files whose bytes duplicate an earlier one.
+
+	trimesh names textures per material, so materials that differ only in
+	colour still each get a copy of a shared image. Duplicates are removed and
+	``map_*``-style references in the MTL files are pointed at the first copy.
+	"""
+
+	canonical: dict[bytes, str] = {}
+	renamed: dict[str, str] = {}
+	unique: dict[str, bytes] = {}
+	for name, data in side_files.items():
+		if not name.lower().endswith(".mtl"):
+			key = hashlib.blake2b(data, digest_size=16).digest()
+			first = canonical.setdefault(key, name)
+			if first != name:
+				renamed[name] = first
+				continue
+		unique[name] = data
+
+	if not renamed:
+		return unique
+
+	LOGGER.debug("Deduplicated %s texture file(s)", len(renamed))
+	for name, data in unique.items():
+		if name.lower().endswith(".mtl"):
+			unique[name] = _rewrite_mtl_maps(data, renamed)
+	return unique
+
+
+def _prefix_textures(side_files: dict[str, bytes], prefix: str) -> dict[str, bytes]:
+	"""Prepend ``prefix`` to texture file names and update the MTL references."""
+
+	renamed = {name: prefix + name for name in side_files if not name.lower().endswith(".mtl")}
+	if not renamed:
+		return side_files
+	return {
+		renamed.get(name, name): _rewrite_mtl_maps(data, renamed) if name not in renamed else data
+		for name, data in side_files.items()
+	}
+
+
+def _rewrite_mtl_maps(mtl: bytes, renamed: dict[str, str]) -> bytes:
+	lines = mtl.decode("utf-8").split("\n")
+	for idx, line in enumerate(lines):
+		if not line.lstrip().startswith(_MTL_MAP_STATEMENTS):
+			continue
+		head, sep, target = line.rpartition(" ")
+		if target in renamed:
+			lines[idx] = f"{head}{sep}{renamed[target]}"
+	return "\n".join(lines).encode("utf-8")
 
 
 def run_conversion(args: argparse.Namespace) -> ConversionStats:
@@ -191,15 +413,37 @@ def run_conversion(args: argparse.Namespace) -> ConversionStats:
 
 	glb_files = collect_glb_files(args.input, args.recursive)
 
+	convert_one = partial(
+		convert_file,
+		dst_root=args.output,
+		input_root=args.input,
+		overwrite=args.overwrite,
+	)
+
 	stats = ConversionStats()
-	for idx, glb_file in enumerate(glb_files, start=1):
-		result = convert_file(glb_file, args.output, args.input, args.overwrite)
-		setattr(stats, result, getattr(stats, result) + 1)
-		LOGGER.debug("Progress: %s/%s", idx, len(glb_files))
+	workers = min(max(1, args.workers), len(glb_files))
+	if workers <= 1:
+		results = map(convert_one, glb_files)
+		_tally(stats, results, len(glb_files))
+		return stats
+
+	# trimesh parsing/export holds the GIL, so files are spread over processes.
+	with ProcessPoolExecutor(
+		max_workers=workers,
+		initializer=configure_logging,
+		initargs=(args.quiet,),
+	) as pool:
+		_tally(stats, pool.map(convert_one, glb_files), len(glb_files))
 
 	return stats
 
 
+def _tally(stats: ConversionStats, results: Iterable[str], total: int) -> None:
+	for idx, result in enumerate(results, start=1):
+		setattr(stats, result, getattr(stats, result) + 1)
+		LOGGER.debug("Progress: %s/%s", idx, total)
+
+
 def configure_logging(quiet: bool) -> None:
 	level = logging.WARNING if quiet else logging.INFO
 	logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
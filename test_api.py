@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 import argparse
+import shutil
 import sys
 import time
-from io import BytesIO
+from email.message import Message
 from pathlib import Path
 from zipfile import BadZipFile, ZipFile
 from typing import Any
@@ -15,8 +16,10 @@ import requests
 
 DEFAULT_BASE_URL = "https://glbobx-api.onrender.com"
 DEFAULT_OUTPUT_DIR = Path("output")
-POLL_INTERVAL_SECONDS = 2.0
-MAX_POLL_ATTEMPTS = 90  # 3 minutes by default
+POLL_INTERVAL_SECONDS = 0.25
+MAX_POLL_INTERVAL_SECONDS = 5.0
+POLL_BACKOFF = 1.5
+MAX_POLL_ATTEMPTS = 45  # roughly 3.5 minutes with backoff
 
 
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
@@ -49,7 +52,12 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
 		"--interval",
 		type=float,
 		default=POLL_INTERVAL_SECONDS,
-		help="Seconds to wait between polls.",
+		help="Seconds to wait before the second poll; the delay then grows to at most 5s.",
+	)
+	parser.add_argument(
+		"--verify",
+		action="store_true",
+		help="CRC-check every archive member after download (default: only check the ZIP directory).",
 	)
 	return parser.parse_args(argv)
 
@@ -69,18 +77,29 @@ def submit_job(base_url: str, glb_path: Path) -> str:
 
 
 def poll_status(base_url: str, job_id: str, attempts: int, interval: float) -> dict[str, Any]:
+	delay = interval
+	last_status: str | None = None
+	headers: dict[str, str] = {}
 	for attempt in range(1, attempts + 1):
-		response = requests.get(f"{base_url}/jobs/{job_id}", timeout=30)
-		if response.status_code == 404:
-			time.sleep(interval)
+		if attempt > 1:
+			time.sleep(delay)
+			delay = min(MAX_POLL_INTERVAL_SECONDS, delay * POLL_BACKOFF)
+
+		response = requests.get(f"{base_url}/jobs/{job_id}", headers=headers, timeout=30)
+		if response.status_code in {304, 404}:
 			continue
-			
+
 		response.raise_for_status()
+		if "ETag" in response.headers:
+			headers["If-None-Match"] = response.headers["ETag"]
 		payload = response.json()
 		status = payload.get("status")
 		if status in {"finished", "failed", "timeout"}:
 			return payload
-			time.sleep(interval)
+		if status != last_status:
+			# The job just moved on; check again soon rather than waiting out the backoff.
+			last_status = status
+			delay = interval
 
 	raise TimeoutError(f"Job {job_id} did not finish after {attempts} attempts")
 
@@ -90,42 +109,46 @@ def _detect_filename(headers: dict[str, str], fallback: str) -> str:
 	if not content_disposition:
 		return fallback
 
-	parts = content_disposition.split(";")
-	for part in parts:
-		part = part.strip()
-		if part.lower().startswith("filename="):
-			value = part.split("=", 1)[1].strip().strip('"')
-			return value or fallback
-	return fallback
+	# email's header parser handles quoting and RFC 2231 encoded filenames.
+	message = Message()
+	message["Content-Disposition"] = content_disposition
+	return message.get_filename(failobj=fallback) or fallback
 
 
-def download_archive(base_url: str, job_id: str, output_dir: Path) -> Path:
+def download_archive(base_url: str, job_id: str, output_dir: Path, verify: bool = False) -> Path:
 	response = requests.get(f"{base_url}/jobs/{job_id}/download", timeout=120, stream=True)
 	response.raise_for_status()
 	filename = _detect_filename(response.headers, fallback=f"{job_id}.zip")
 	output_dir.mkdir(parents=True, exist_ok=True)
 	final_path = output_dir / filename
 
+	partial_path = final_path.with_name(final_path.name + ".part")
+
 	try:
-		data = bytearray()
-		for chunk in response.iter_content(chunk_size=8192):
-			if chunk:
-				data.extend(chunk)
+		# Stream straight to disk; the file is only moved into place once it
+		# has been validated.
+		response.raw.decode_content = True
+		with partial_path.open("wb") as handle:
+			shutil.copyfileobj(response.raw, handle, length=1 << 20)
 
-		if not data:
+		if partial_path.stat().st_size == 0:
 			raise RuntimeError("Received empty response when downloading archive")
 
-		# Validate ZIP integrity before writing to disk.
-		with ZipFile(BytesIO(data)) as archive:
-			bad_member = archive.testzip()
-			if bad_member is not None:
-				raise RuntimeError(f"Archive corrupted at member {bad_member}")
-
-		final_path.write_bytes(data)
+		# Opening the archive parses its central directory, which catches
+		# truncated or non-ZIP responses; the full CRC pass is opt-in.
+		with ZipFile(partial_path) as archive:
+			if not archive.namelist():
+				raise RuntimeError("Downloaded archive contains no files")
+			if verify:
+				bad_member = archive.testzip()
+				if bad_member is not None:
+					raise RuntimeError(f"Archive corrupted at member {bad_member}")
+
+		partial_path.replace(final_path)
 		return final_path
-	except KeyboardInterrupt:
-		if final_path.exists():
-			final_path.unlink()
+	except (Exception, KeyboardInterrupt):
+		if partial_path.exists():
+			partial_path.unlink()
 		raise
 
 
@@ -143,7 +166,7 @@ def main(argv: list[str] | None = None) -> int:
 		print(f"Detail: {result.get('detail')}")
 		return 1
 
-	archive_path = download_archive(args.base_url.rstrip("/"), job_id, args.output_dir)
+	archive_path = download_archive(args.base_url.rstrip("/"), job_id, args.output_dir, verify=args.verify)
 	print(f"Downloaded archive to {archive_path} containing: {result.get('artefacts')}")
 	return 0
 